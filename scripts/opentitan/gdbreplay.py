@@ -0,0 +1,901 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2024 Rivos, Inc.
+# SPDX-License-Identifier: Apache2
+
+"""QEMU execution trace replayer.
+
+   Exposes a QEMU execution trace (`-d exec,nochain` log) as a GDB remote
+   target, so the recorded instruction stream can be navigated - forward
+   and backward - from a regular GDB client.
+"""
+
+from argparse import ArgumentParser, FileType
+from array import array as py_array
+from bisect import bisect_right, insort
+from functools import lru_cache
+from logging import DEBUG, getLogger
+from mmap import ACCESS_READ, mmap
+from os import stat
+from os.path import dirname, join as joinpath, normpath
+from re import compile as re_compile, MULTILINE
+from select import select
+from socket import (socket, AF_INET, IPPROTO_TCP, SOCK_STREAM, SOL_SOCKET,
+                    SO_RCVBUF, SO_REUSEADDR, TCP_NODELAY)
+from struct import unpack_from
+from sys import exit as sysexit, intern, modules, path as syspath, stderr
+from traceback import format_exc
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+syspath.append(joinpath(dirname(normpath(__file__))))
+
+# pylint: disable=wrong-import-position
+from ot.util.elf import ElfBlob
+from ot.util.log import configure_loggers
+from ot.util.misc import HexInt
+
+
+@lru_cache(maxsize=32)
+def _load_elf(path: str, _mtime_ns: int, _size: int) -> ElfBlob:
+    """Load and parse an ELF file, memoizing the result.
+
+       The cache key includes the file's modification time and size so an
+       edited file is re-parsed, while repeat loads of the same file (as
+       with multi-core replays sharing one application) are free.
+
+       :param path: the path to the ELF file
+       :param _mtime_ns: the file modification time, part of the cache key
+       :param _size: the file size, part of the cache key
+       :return: the parsed ELF blob
+    """
+    eblob = ElfBlob()
+    with open(path, 'rb') as efp:
+        eblob.load(efp)
+    return eblob
+
+
+def _cont_kernel_py(pcs: np.ndarray, xpos: int, move: int,
+                    lo: np.ndarray, hi: np.ndarray) -> Tuple[int, int]:
+    """Scan the PC stream for the next breakpoint hit.
+
+       Kept as a free function over plain arrays so it can be jitted with
+       Numba when available; the pure-Python version is the fallback.
+
+       :param pcs: the recorded PCs
+       :param xpos: the current stream position
+       :param move: +1 to scan forward, -1 to scan backward
+       :param lo: the breakpoint region start addresses
+       :param hi: the breakpoint region end addresses (exclusive)
+       :return: (new stream position, 1-based breakpoint index or 0)
+    """
+    count = pcs.shape[0]
+    pos = xpos
+    last_pc = np.uint64(0)
+    has_last = False
+    while True:
+        pos += move
+        if pos < 0 or pos >= count:
+            return pos - move, 0
+        pc = pcs[pos]
+        if has_last and pc == last_pc:
+            continue
+        last_pc = pc
+        has_last = True
+        for k in range(lo.shape[0]):
+            if lo[k] <= pc and pc < hi[k]:
+                return pos, k + 1
+
+
+if njit:
+    _cont_kernel = njit(cache=True)(_cont_kernel_py)
+else:
+    _cont_kernel = _cont_kernel_py
+
+
+class QEMUMemoryController:
+    """Store the memory banks of the replayed machine and serve read
+       requests.
+    """
+
+    def __init__(self):
+        self._log = getLogger('gdbrp.mem')
+        # banks are stored as (start, stop, blob), sorted by start address,
+        # with a parallel list of start addresses for bisecting
+        self._banks: List[Tuple[int, int, bytes]] = []
+        self._starts: List[int] = []
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """Provide the generation of the bank configuration, so clients can
+           invalidate whatever they may have cached about memory content.
+        """
+        return self._generation
+
+    def add_memory(self, address: int, blob: bytes) -> None:
+        """Register a new memory bank.
+
+           :param address: the address of the first byte of the bank
+           :param blob: the memory content
+        """
+        self._log.info('Add memory bank 0x%08x..0x%08x',
+                       address, address + len(blob))
+        # store a memoryview so reads can slice and decode in place
+        insort(self._banks, (address, address + len(blob), memoryview(blob)))
+        self._starts.insert(bisect_right(self._starts, address), address)
+        self._generation += 1
+
+    def read(self, address: int, length: int) -> memoryview:
+        """Read out memory bank content.
+
+           :param address: the address of the first byte to read
+           :param length: the count of bytes to read
+           :return: a zero-copy view of the memory content
+           :raise IndexError: if the address does not belong to any bank
+        """
+        pos = bisect_right(self._starts, address) - 1
+        if pos >= 0:
+            start, stop, blob = self._banks[pos]
+            if address < stop:
+                offset = address - start
+                return blob[offset:offset+length]
+        raise IndexError(f'Invalid address 0x{address:08x}')
+
+    def read_u16_le(self, address: int) -> int:
+        """Read a 16-bit little-endian value, decoded in place.
+
+           :param address: the address of the first byte to read
+           :return: the decoded value
+           :raise IndexError: if the address does not belong to any bank
+        """
+        pos = bisect_right(self._starts, address) - 1
+        if pos >= 0:
+            start, stop, blob = self._banks[pos]
+            if address + 1 < stop:
+                return unpack_from('<H', blob, address - start)[0]
+        raise IndexError(f'Invalid address 0x{address:08x}')
+
+
+class QEMUVCPU:
+    """Track the execution stream of a single vCPU.
+
+       :param index: the vCPU index
+       :param memctrl: the memory controller of the replayed machine
+    """
+
+    BREAK_INDEX_LIMIT = 4096
+    """Widest overall breakpoint region for which breakpoint addresses are
+       expanded against the PC index; wider regions fall back to a scan.
+    """
+
+    def __init__(self, index: int, memctrl: QEMUMemoryController):
+        self._log = getLogger(f'gdbrp.vcpu{index}')
+        self._memctrl = memctrl
+        # the execution stream is stored as structure-of-arrays: packed
+        # machine integers for the PCs and small indices into a
+        # deduplicated function name table, rather than one Python tuple,
+        # int and str per executed instruction
+        self._pc_arr = py_array('Q')
+        self._fidx_arr = py_array('l')
+        self._func_table: List[str] = []
+        self._func_map: Dict[str, int] = {}
+        self._pcs = np.empty(0, dtype=np.uint64)
+        self._func_idx = np.empty(0, dtype=np.int64)
+        self._pc_index: Optional[Dict[int, np.ndarray]] = None
+        self._dirty = False
+        self._xpos = 0
+        self._hwbreaks: List[Tuple[int, int]] = []
+        self._ilen_cache: Dict[int, int] = {}
+        self._ilen_gen = memctrl.generation
+
+    def record(self, pc: int, func: str) -> None:
+        """Record the execution of a single instruction.
+
+           :param pc: the program counter of the instruction
+           :param func: the name of the function the instruction belongs to
+        """
+        self._release_views()
+        fidx = self._func_map.get(func)
+        if fidx is None:
+            fidx = len(self._func_table)
+            self._func_map[func] = fidx
+            self._func_table.append(func)
+        self._pc_arr.append(pc)
+        self._fidx_arr.append(fidx)
+        self._dirty = True
+
+    def record_many(self, stream: List[Tuple[int, str]]) -> None:
+        """Record a batch of executed instructions at once.
+
+           :param stream: a sequence of (program counter, function name)
+        """
+        self._release_views()
+        func_map = self._func_map
+        func_table = self._func_table
+        fidx_arr = self._fidx_arr
+        self._pc_arr.extend(pc for pc, _ in stream)
+        for _, func in stream:
+            fidx = func_map.get(func)
+            if fidx is None:
+                fidx = len(func_table)
+                func_map[func] = fidx
+                func_table.append(func)
+            fidx_arr.append(fidx)
+        self._dirty = True
+
+    def _release_views(self) -> None:
+        """Drop the NumPy views before the stream storage is resized, as
+           the arrays cannot reallocate while their buffer is exported.
+        """
+        if not self._dirty:
+            self._pcs = np.empty(0, dtype=np.uint64)
+            self._func_idx = np.empty(0, dtype=np.int64)
+            self._pc_index = None
+
+    def _sync(self) -> None:
+        """Refresh the NumPy views over the recorded stream."""
+        if self._dirty:
+            self._pcs = np.frombuffer(self._pc_arr, dtype=np.uint64)
+            self._func_idx = np.frombuffer(self._fidx_arr, dtype=np.int64)
+            self._dirty = False
+
+    @property
+    def pc(self) -> int:
+        """Provide the current program counter."""
+        if self._xpos >= len(self._pc_arr):
+            raise IndexError('Empty execution stream')
+        return self._pc_arr[self._xpos]
+
+    @property
+    def func(self) -> str:
+        """Provide the name of the current function."""
+        return self._func_table[self._fidx_arr[self._xpos]]
+
+    @property
+    def instruction_length(self) -> int:
+        """Provide the length in bytes of the current instruction."""
+        return self._get_instruction_length(self.pc)
+
+    def step(self, back: bool = False) -> None:
+        """Move one executed instruction forward or backward.
+
+           :param back: whether to step backward
+           :raise IndexError: if either end of the stream has been reached
+        """
+        pos = self._xpos + (1, -1)[int(back)]
+        if not 0 <= pos < len(self._pc_arr):
+            raise IndexError('End of execution stream')
+        self._xpos = pos
+
+    def cont(self, back: bool = False, addr: Optional[int] = None) \
+            -> Optional[int]:
+        """Resume execution until a HW breakpoint is hit or the stream ends.
+
+           :param back: whether to resume backward
+           :param addr: if defined, move to this address rather than resuming
+           :return: the breakpoint identifier if one was hit
+        """
+        if addr is not None:
+            self._move_to(addr, back)
+            return None
+        if not self._hwbreaks:
+            # nothing can stop the replay: jump straight to the end
+            self._xpos = 0 if back else max(len(self._pc_arr) - 1, 0)
+            return None
+        hwbreak_spans = self._hwbreaks
+        if sum(hi - lo for lo, hi in hwbreak_spans) <= self.BREAK_INDEX_LIMIT:
+            return self._cont_indexed(back, hwbreak_spans)
+        return self._cont_scan(back, hwbreak_spans)
+
+    def _cont_indexed(self, back: bool, hwbreak_spans: List[Tuple[int, int]]) \
+            -> Optional[int]:
+        """Resume execution by bisecting the PC index for the next
+           breakpoint hit, instead of stepping through the stream.
+
+           :param back: whether to resume backward
+           :param hwbreak_spans: the breakpoint regions as (lo, hi) pairs
+           :return: the breakpoint identifier if one was hit
+        """
+        pc_index = self._get_pc_index()
+        candidates = [pc_index[bpc]
+                      for lo, hi in hwbreak_spans
+                      for bpc in range(lo, hi) if bpc in pc_index]
+        pos = self._xpos
+        if candidates:
+            cand = np.concatenate(candidates)
+            cand.sort()
+            if back:
+                loc = int(np.searchsorted(cand, pos, 'left')) - 1
+                hit_pos = int(cand[loc]) if loc >= 0 else None
+            else:
+                loc = int(np.searchsorted(cand, pos, 'right'))
+                hit_pos = int(cand[loc]) if loc < cand.size else None
+            if hit_pos is not None:
+                self._xpos = hit_pos
+                pc = self._pc_arr[hit_pos]
+                for hwp, (lo, hi) in enumerate(hwbreak_spans, start=1):
+                    if lo <= pc < hi:
+                        self._log.info('HW breakpoint #%d hit @ 0x%08x',
+                                       hwp, pc)
+                        return hwp
+        self._xpos = 0 if back else max(len(self._pc_arr) - 1, 0)
+        return None
+
+    def _cont_scan(self, back: bool, hwbreak_spans: List[Tuple[int, int]]) \
+            -> Optional[int]:
+        """Resume execution, scanning the stream one instruction at a time.
+
+           The scan itself runs in _cont_kernel, jitted when Numba is
+           installed: the loop is pure integer arithmetic over flat arrays,
+           exactly what a jit compiler handles well.
+
+           :param back: whether to resume backward
+           :param hwbreak_spans: the breakpoint regions as (lo, hi) pairs
+           :return: the breakpoint identifier if one was hit
+        """
+        self._sync()
+        lo = np.array([span[0] for span in hwbreak_spans], dtype=np.uint64)
+        hi = np.array([span[1] for span in hwbreak_spans], dtype=np.uint64)
+        pos, hit = _cont_kernel(self._pcs, self._xpos, -1 if back else 1,
+                                lo, hi)
+        self._xpos = int(pos)
+        if hit:
+            self._log.info('HW breakpoint #%d hit @ 0x%08x', hit,
+                           self._pc_arr[self._xpos])
+            return int(hit)
+        return None
+
+    def _get_pc_index(self) -> Dict[int, np.ndarray]:
+        """Provide a map of the stream positions of each recorded PC, with
+           positions sorted in execution order.
+        """
+        self._sync()
+        if self._pc_index is None:
+            pcs = self._pcs
+            order = np.argsort(pcs, kind='stable')
+            uniq, starts = np.unique(pcs[order], return_index=True)
+            self._pc_index = {
+                int(upc): positions
+                for upc, positions in zip(uniq, np.split(order, starts[1:]))
+            }
+        return self._pc_index
+
+    def add_hw_break(self, address: int, length: int) -> None:
+        """Add a new hardware breakpoint.
+
+           :param address: the first address of the breakpoint region
+           :param length: the size of the breakpoint region
+           :raise ValueError: if the breakpoint is already defined
+        """
+        hwbrk = (address, address + length)
+        if hwbrk in self._hwbreaks:
+            raise ValueError(f'Breakpoint @ 0x{address:08x} already defined')
+        self._hwbreaks.append(hwbrk)
+
+    def del_hw_break(self, address: int, length: int) -> None:
+        """Remove a hardware breakpoint.
+
+           :param address: the first address of the breakpoint region
+           :param length: the size of the breakpoint region
+           :raise ValueError: if no such breakpoint is defined
+        """
+        hwbrk = (address, address + length)
+        try:
+            self._hwbreaks.remove(hwbrk)
+        except ValueError as exc:
+            raise ValueError(f'No breakpoint @ 0x{address:08x}') from exc
+
+    def _move_to(self, pc: int, back: bool = False) -> None:
+        """Move the execution position to the next occurrence of an address.
+
+           :param pc: the program counter to reach
+           :param back: whether to search backward
+           :raise IndexError: if the address is never reached
+        """
+        positions = self._get_pc_index().get(pc)
+        pos = self._xpos
+        if positions is not None:
+            if back:
+                loc = int(np.searchsorted(positions, pos, 'left')) - 1
+                if loc >= 0:
+                    self._xpos = int(positions[loc])
+                    return
+            else:
+                loc = int(np.searchsorted(positions, pos, 'right'))
+                if loc < len(positions):
+                    self._xpos = int(positions[loc])
+                    return
+        raise IndexError(f'Address 0x{pc:08x} never reached')
+
+    def _get_instruction_length(self, pc: int) -> int:
+        """Provide the length in bytes of the instruction at an address.
+
+           The decision is memoized: within a replay the instruction at a
+           given address never changes, and traces revisit the same PCs over
+           and over.
+
+           :param pc: the address of the instruction
+           :return: the instruction length in bytes
+        """
+        if self._ilen_gen != self._memctrl.generation:
+            # a memory bank has been added since the last probe, drop any
+            # stale decision
+            self._ilen_cache.clear()
+            self._ilen_gen = self._memctrl.generation
+        length = self._ilen_cache.get(pc)
+        if length is not None:
+            return length
+        # the low 16 bits are enough to tell a compressed instruction
+        instr = self._memctrl.read_u16_le(pc)
+        length = 4 if instr & 0x3 == 0x3 else 2
+        if self._log.isEnabledFor(DEBUG):
+            self._log.debug('Instruction @ 0x%08x: %04x', pc, instr)
+        self._ilen_cache[pc] = length
+        return length
+
+
+class QEMUGDBReplay:
+    """GDB remote target that replays a QEMU execution trace."""
+
+    TCRE = re_compile(rb'^Trace (\d+): 0x[0-9a-f]+ '
+                      rb'\[[0-9a-f]+/([0-9a-f]+)[^\]\n]*\] ([^\r\n]*)\r?$',
+                      MULTILINE)
+    """Matcher for `-d exec` trace lines: vCPU index, guest PC, function."""
+
+    TRACE_CHUNK_SIZE = 8 << 20
+    """Read granularity when streaming the trace file."""
+
+    def __init__(self):
+        self._log = getLogger('gdbrp')
+        self._memctrl = QEMUMemoryController()
+        self._vcpus: Dict[int, QEMUVCPU] = {}
+        self._conn: Optional[socket] = None
+        self._log_debug = self._log.isEnabledFor(DEBUG)
+        self._parse_off = 0
+        self._resume = False
+        self._cpu = 0
+        self._entry_point: Optional[int] = None
+        self._xx_regs = ''
+        self.xlen = 4
+        # precompiled dispatch tables: one dict lookup per packet instead
+        # of string formatting and getattr probing
+        self._dispatch: Dict[bytes, Callable[[bytearray], Optional[str]]] = {}
+        self._updispatch: Dict[bytes, Callable[[bytearray],
+                                               Optional[str]]] = {}
+        self._qdispatch: Dict[str, Callable[[str], str]] = {}
+        for name in dir(self):
+            if not name.startswith('_do_'):
+                continue
+            if name.startswith('_do_query_'):
+                self._qdispatch[name[len('_do_query_'):]] = getattr(self, name)
+            elif name.startswith('_do__'):
+                key = name[len('_do__'):].upper().encode()
+                self._updispatch[key] = getattr(self, name)
+            elif name != '_do_interrogate':
+                self._dispatch[name[len('_do_'):].encode()] = \
+                    getattr(self, name)
+        self._dispatch[b'?'] = self._do_interrogate
+
+    @property
+    def _vcpu(self) -> QEMUVCPU:
+        """Provide the currently selected vCPU."""
+        try:
+            return self._vcpus[self._cpu]
+        except KeyError as exc:
+            raise RuntimeError(f'No such vCPU: {self._cpu}') from exc
+
+    def load_elf(self, efp: BinaryIO) -> None:
+        """Load a memory bank from an ELF application.
+
+           :param efp: the ELF file
+        """
+        eblob = ElfBlob()
+        eblob.load(efp)
+        efp.close()
+        self._register_elf(eblob)
+
+    def load_elf_path(self, path: str) -> None:
+        """Load a memory bank from an ELF application file path.
+
+           Repeated loads of the same, unmodified file reuse the already
+           parsed blob.
+
+           :param path: the path to the ELF file
+        """
+        fstat = stat(path)
+        self._register_elf(_load_elf(path, fstat.st_mtime_ns, fstat.st_size))
+
+    def _register_elf(self, eblob: ElfBlob) -> None:
+        """Register a parsed ELF blob as a memory bank.
+
+           :param eblob: the parsed ELF blob
+        """
+        self.xlen = eblob.address_size // 8
+        if self._entry_point is None:
+            self._entry_point = eblob.entry_point
+        self._memctrl.add_memory(eblob.load_address, eblob.blob)
+
+    def load_bin(self, address: int, bfp: BinaryIO) -> None:
+        """Load a memory bank from a raw binary file.
+
+           :param address: the address of the first byte of the bank
+           :param bfp: the binary file
+        """
+        try:
+            # map the file rather than copying it: the memory controller
+            # only ever slices the bank, which the page cache serves
+            # directly; the mapping outlives the file handle
+            blob = mmap(bfp.fileno(), 0, access=ACCESS_READ)
+        except (AttributeError, OSError, ValueError):
+            blob = bfp.read()
+        self._memctrl.add_memory(address, blob)
+        bfp.close()
+
+    def load(self, qfp: BinaryIO) -> None:
+        """Load the execution stream from a QEMU execution trace.
+
+           :param qfp: the QEMU trace log file, opened in binary mode
+        """
+        self._log.info('Loading trace')
+        streams: Dict[bytes, List[Tuple[int, str]]] = {}
+        # the same few thousand function names repeat across millions of
+        # matches: decode each distinct name once and share the interned
+        # string instead of allocating one str per trace line
+        func_cache: Dict[bytes, str] = {}
+        # stream the trace in large binary chunks: the regex pass runs on
+        # raw bytes so the text codec layer and per-line str allocations
+        # are skipped, and memory stays bounded on multi-GB logs
+        buf = bytearray()
+        while True:
+            data = qfp.read(self.TRACE_CHUNK_SIZE)
+            if not data:
+                break
+            if isinstance(data, str):
+                # tolerate text-mode file objects
+                data = data.encode()
+            buf += data
+            # only match complete lines, keep any trailing partial one
+            cut = buf.rfind(b'\n') + 1
+            if not cut:
+                continue
+            self._parse_trace(buf, cut, streams, func_cache)
+            del buf[:cut]
+        if buf:
+            self._parse_trace(buf, len(buf), streams, func_cache)
+        qfp.close()
+        for scpu, stream in streams.items():
+            cpu = int(scpu)
+            vcpu = self._vcpus.get(cpu)
+            if not vcpu:
+                vcpu = QEMUVCPU(cpu, self._memctrl)
+                self._vcpus[cpu] = vcpu
+            vcpu.record_many(stream)
+        if not self._vcpus:
+            raise ValueError('No execution trace found')
+        self._log.info('Loaded execution stream of %d vCPU(s)',
+                       len(self._vcpus))
+
+    def _parse_trace(self, buf: bytearray, end: int,
+                     streams: Dict[bytes, List[Tuple[int, str]]],
+                     func_cache: Dict[bytes, str]) -> None:
+        """Extract the trace records from a chunk of complete lines.
+
+           :param buf: the raw trace bytes
+           :param end: the offset of the last complete line end in buf
+           :param streams: the per-vCPU execution streams to extend
+           :param func_cache: the shared function name cache
+        """
+        for tmo in self.TCRE.finditer(buf, 0, end):
+            scpu, spc, func = tmo.groups()
+            stream = streams.get(scpu)
+            if stream is None:
+                stream = streams.setdefault(scpu, [])
+            fname = func_cache.get(func)
+            if fname is None:
+                fname = intern(func.decode())
+                func_cache[func] = fname
+            stream.append((int(spc, 16), fname))
+
+    def serve(self, port: int) -> None:
+        """Serve GDB remote clients, one at a time.
+
+           :param port: the TCP port to listen on
+        """
+        gdbs = socket(AF_INET, SOCK_STREAM)
+        gdbs.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
+        gdbs.bind(('localhost', port))
+        gdbs.listen(1)
+        while True:
+            self._log.info('Waiting for GDB client on port %d', port)
+            self._conn, peer = gdbs.accept()
+            self._log.info('Connection from %s:%d', *peer)
+            # GDB exchanges many tiny packets: without TCP_NODELAY, Nagle
+            # delays each ack/reply and makes interactive stepping sluggish
+            self._conn.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+            self._conn.setsockopt(SOL_SOCKET, SO_RCVBUF, 65536)
+            self._log_debug = self._log.isEnabledFor(DEBUG)
+            self._resume = True
+            try:
+                self._serve()
+            finally:
+                self._conn.close()
+                self._conn = None
+
+    def _serve(self) -> None:
+        """Handle GDB remote serial protocol packets."""
+        buf = bytearray()
+        self._parse_off = 0
+        while self._resume:
+            # poll with a small timeout so a shutdown request is honored
+            # even when the client stays silent
+            ready = select((self._conn,), (), (), 0.1)[0]
+            if not ready:
+                continue
+            data = self._conn.recv(1024)
+            if not data:
+                self._log.info('Connection closed by peer')
+                break
+            buf.extend(data)
+            if buf and buf[0] == 0x03:
+                # Ctrl-C: nothing to interrupt, the target is always stopped
+                del buf[0]
+                continue
+            # drain every complete frame: GDB pipelines several packets per
+            # TCP segment, none of them may be dropped
+            while self._resume:
+                start = buf.find(b'$', self._parse_off)
+                if start < 0:
+                    # no frame start in sight: never rescan these bytes
+                    self._parse_off = len(buf)
+                    break
+                end = buf.find(b'#', start + 1)
+                if end < 0 or len(buf) < end + 3:
+                    # incomplete frame: resume scanning from its start
+                    self._parse_off = start
+                    break
+                req = buf[start+1:end]
+                crc = int(bytes(buf[end+1:end+3]), 16)
+                # sum a memoryview rather than the bytearray slice: the
+                # checksum then runs at C speed without an extra copy
+                valid = crc == sum(memoryview(buf)[start+1:end]) & 0xff
+                # consume the frame in place, keeping any trailing bytes
+                del buf[:end+3]
+                self._parse_off = 0
+                if not valid:
+                    self._log.warning('Invalid checksum')
+                    self._conn.sendall(b'-')
+                    continue
+                resp = self._handle_request(req)
+                # coalesce the ack and the response into a single send
+                if resp is None:
+                    out = b'+'
+                else:
+                    packet = self._frame(resp.encode())
+                    if self._log_debug:
+                        self._log.debug('Reply: %s', packet)
+                    out = b'+' + packet
+                self._conn.sendall(out)
+
+    def _handle_request(self, req: bytearray) -> Optional[str]:
+        """Decode a GDB request and dispatch it to its handler.
+
+           :param req: the unframed request
+           :return: the response payload, if any
+        """
+        if self._log_debug:
+            # bytes(req) would otherwise be materialized per packet even
+            # when the record is filtered out
+            self._log.debug('Request: %s', bytes(req))
+        clen = 1
+        handler = self._dispatch.get(bytes(req[0:1]))
+        if not handler:
+            handler = self._dispatch.get(bytes(req[0:2]))
+            if handler:
+                clen = 2
+            else:
+                handler = self._updispatch.get(bytes(req[0:1]))
+        if not handler:
+            self._log.warning('Unsupported command: %s', bytes(req))
+            return ''
+        try:
+            return handler(req[clen:])
+        except RuntimeError as exc:
+            self._log.error('Cannot handle request: %s', exc)
+            return self._error(1)
+
+    @classmethod
+    def _frame(cls, payload: bytes) -> bytes:
+        """Frame a GDB response payload.
+
+           :param payload: the unframed response
+           :return: the framed packet
+        """
+        crc = sum(payload) & 0xff
+        return b''.join((b'$', payload, b'#', f'{crc:02x}'.encode()))
+
+    @classmethod
+    def _error(cls, code: int) -> str:
+        return f'E{code:02x}'
+
+    def _do_interrogate(self, _req: bytearray) -> str:
+        return 'S05'
+
+    def _do_q(self, req: bytearray) -> str:
+        query = bytes(req).decode()
+        qname = query.split(':', 1)[0].split(',', 1)[0]
+        handler = self._qdispatch.get(qname.lower())
+        if not handler:
+            self._log.debug('Unsupported query: %s', qname)
+            return ''
+        return handler(query[len(qname):].lstrip(':'))
+
+    def _do_query_supported(self, _args: str) -> str:
+        return 'PacketSize=4096;ReverseStep+;ReverseContinue+'
+
+    def _do_query_attached(self, _args: str) -> str:
+        return '1'
+
+    def _do_query_c(self, _args: str) -> str:
+        return f'QC{self._cpu+1:x}'
+
+    def _do_query_fthreadinfo(self, _args: str) -> str:
+        return 'm' + ','.join(f'{cpu+1:x}' for cpu in self._vcpus)
+
+    def _do_query_sthreadinfo(self, _args: str) -> str:
+        return 'l'
+
+    def _do_query_symbol(self, _args: str) -> str:
+        return 'OK'
+
+    def _do_g(self, _req: bytearray) -> str:
+        # general purpose registers are not recorded in the trace, report
+        # them as unavailable; only the program counter is known
+        xlen = self.xlen
+        prefix = self._xx_regs
+        if len(prefix) != 64 * xlen:
+            prefix = 'xx' * (32 * xlen)
+            self._xx_regs = prefix
+        try:
+            pc = self._vcpu.pc
+        except IndexError:
+            return prefix + 'xx' * xlen
+        return prefix + pc.to_bytes(xlen, 'little').hex()
+
+    def _do_m(self, req: bytearray) -> str:
+        try:
+            saddr, slength = bytes(req).decode().split(',')
+            address = int(saddr, 16)
+            length = int(slength, 16)
+        except ValueError:
+            return self._error(22)
+        try:
+            data = self._memctrl.read(address, length)
+        except IndexError:
+            return self._error(14)
+        return data.hex()
+
+    def _do_s(self, _req: bytearray) -> str:
+        return self._step(back=False)
+
+    def _do_bs(self, _req: bytearray) -> str:
+        return self._step(back=True)
+
+    def _do_c(self, req: bytearray) -> str:
+        return self._cont(req, back=False)
+
+    def _do_bc(self, req: bytearray) -> str:
+        return self._cont(req, back=True)
+
+    def _do_k(self, _req: bytearray) -> None:
+        self._log.info('Killed by client')
+        self._resume = False
+        return None
+
+    def _do__d(self, _req: bytearray) -> str:
+        self._resume = False
+        return 'OK'
+
+    def _do__h(self, _req: bytearray) -> str:
+        return 'OK'
+
+    def _do__t(self, _req: bytearray) -> str:
+        return 'OK'
+
+    def _do__z(self, req: bytearray) -> str:
+        return self._breakpoint(req, remove=False)
+
+    def _do_z(self, req: bytearray) -> str:
+        return self._breakpoint(req, remove=True)
+
+    def _step(self, back: bool) -> str:
+        try:
+            self._vcpu.step(back)
+        except IndexError:
+            self._log.info('End of execution stream')
+        return 'S05'
+
+    def _cont(self, req: bytearray, back: bool) -> str:
+        try:
+            addr = int(bytes(req), 16) if req else None
+        except ValueError:
+            return self._error(22)
+        try:
+            self._vcpu.cont(back, addr)
+        except IndexError as exc:
+            self._log.warning('%s', exc)
+        return 'S05'
+
+    def _breakpoint(self, req: bytearray, remove: bool) -> str:
+        try:
+            ztype, saddr, skind = bytes(req).decode().split(',')
+            address = int(saddr, 16)
+            kind = int(skind, 16)
+        except ValueError:
+            return self._error(22)
+        if ztype != '1':
+            # only hardware breakpoints are supported
+            return ''
+        try:
+            if remove:
+                self._vcpu.del_hw_break(address, kind)
+            else:
+                self._vcpu.add_hw_break(address, kind)
+        except ValueError as exc:
+            self._log.warning('%s', exc)
+            return self._error(22)
+        return 'OK'
+
+
+def main():
+    """Main routine."""
+    debug = True
+    try:
+        desc = modules[__name__].__doc__.split('.', 1)[0].strip()
+        argparser = ArgumentParser(description=f'{desc}.')
+        argparser.add_argument('-t', '--trace', type=FileType('rb'),
+                               required=True,
+                               help='QEMU execution trace log')
+        argparser.add_argument('-e', '--elf', action='append',
+                               help='ELF application(s)')
+        argparser.add_argument('-b', '--bin', action='append', nargs=2,
+                               metavar=('ADDRESS', 'FILE'),
+                               help='binary application(s) and load address')
+        argparser.add_argument('-p', '--port', type=int, default=3333,
+                               help='GDB server port (default: 3333)')
+        argparser.add_argument('-v', '--verbose', action='count',
+                               help='increase verbosity')
+        argparser.add_argument('-d', '--debug', action='store_true',
+                               help='enable debug mode')
+        args = argparser.parse_args()
+        debug = args.debug
+
+        configure_loggers(args.verbose, 'gdbrp', 'elf')
+
+        gdbr = QEMUGDBReplay()
+        for elf in args.elf or []:
+            gdbr.load_elf_path(elf)
+        for saddr, binfile in args.bin or []:
+            address = HexInt.parse(saddr)
+            with open(binfile, 'rb') as bfp:
+                gdbr.load_bin(address, bfp)
+        gdbr.load(args.trace)
+        gdbr.serve(args.port)
+        sysexit(0)
+    except (IOError, OSError, ValueError, ImportError) as exc:
+        print(f'\nError: {exc}', file=stderr)
+        if debug:
+            print(format_exc(chain=False), file=stderr)
+        sysexit(1)
+    except KeyboardInterrupt:
+        sysexit(2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+# Copyright (c) 2024 Rivos, Inc.
+# SPDX-License-Identifier: Apache2
+
+"""OpenTitan tools."""
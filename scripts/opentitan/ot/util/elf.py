@@ -0,0 +1,263 @@
+# Copyright (c) 2024 Rivos, Inc.
+# SPDX-License-Identifier: Apache2
+
+"""ELF file loader.
+"""
+
+from io import BytesIO
+from logging import getLogger
+from mmap import ACCESS_READ, mmap
+from operator import itemgetter
+from struct import calcsize, unpack_from
+from typing import BinaryIO, List, Optional, Tuple
+
+from elftools.common.exceptions import ELFError
+from elftools.elf.constants import SH_FLAGS
+from elftools.elf.elffile import ELFFile
+
+
+class ElfBlob:
+    """Load an ELF application and extract a flat binary image of its
+       loadable segments.
+    """
+
+    ELF_MAGIC = b'\x7fELF'
+    """ELF identification magic."""
+
+    EM_RISCV = 243
+    ET_EXEC = 2
+    PT_LOAD = 1
+
+    HEADER_FORMATS = {1: '<HHIIIIIHHHHHH', 2: '<HHIQQQIHHHHHH'}
+    """ELF header layout past e_ident, per ELF class."""
+
+    PHDR_FORMATS = {1: '<IIIIIIII', 2: '<IIQQQQQQ'}
+    """Program header layout, per ELF class."""
+
+    SHDR_FORMATS = {1: '<IIIIIIIIII', 2: '<IIQQQQIIQQ'}
+    """Section header layout, per ELF class."""
+
+    def __init__(self):
+        self._log = getLogger('elf')
+        self._stream = None
+        self._buffer = None
+        self._address_size = 0
+        self._entry: Optional[int] = None
+        # loadable segments as (p_paddr, p_filesz, p_offset, p_vaddr,
+        # p_memsz) tuples, sorted by physical address
+        self._phdrs: List[Tuple[int, int, int, int, int]] = []
+        # sections as (sh_flags, sh_addr, sh_size) tuples
+        self._shdrs: List[Tuple[int, int, int]] = []
+        self._payload_address: Optional[int] = None
+        self._payload_size: Optional[int] = None
+        self._payload: Optional[bytearray] = None
+
+    def load(self, efp: BinaryIO) -> None:
+        """Load the content of an ELF file.
+
+           :param efp: a file-like object of the ELF content
+           :raise ValueError: if the ELF file cannot be parsed
+        """
+        try:
+            # map the file rather than slurping it: only the headers and the
+            # loadable segments are ever read, and the mapping outlives the
+            # file handle so the caller may close it whenever it wants to
+            self._stream = mmap(efp.fileno(), 0, access=ACCESS_READ)
+        except (AttributeError, OSError, ValueError):
+            # file-like object without a real descriptor (or empty file)
+            self._stream = BytesIO(efp.read())
+        try:
+            self._buffer = memoryview(self._stream)
+        except TypeError:
+            self._buffer = self._stream.getbuffer()
+        # the direct parser handles the little-endian classes this tool
+        # actually encounters; anything else goes through pyelftools
+        if not self._parse_raw(self._buffer):
+            self._parse_elftools()
+        self._phdrs.sort(key=itemgetter(0))
+        # parse once, up front: the accessors below become plain attribute
+        # reads, with no lazy-evaluation branch on each call
+        self._payload_address, self._payload_size = self._parse_segments()
+        self._payload = self._build_payload()
+        self._log.debug('entry point: 0x%X', self.entry_point)
+        self._log.debug('data size: %d', self.raw_size)
+
+    @property
+    def address_size(self) -> int:
+        """Provide the width of address value used in the ELFFile.
+
+           :return: the address width in bits (not bytes!)
+        """
+        return self._address_size
+
+    @property
+    def entry_point(self) -> Optional[int]:
+        """Provide the entry point of the application, if any."""
+        return self._entry
+
+    @property
+    def raw_size(self) -> int:
+        """Provide the size of the loadable payload."""
+        return self._payload_size
+
+    @property
+    def load_address(self) -> int:
+        """Provide the physical address of the first loadable segment."""
+        return self._payload_address
+
+    @property
+    def blob(self) -> bytearray:
+        """Provide the loadable payload as a flat binary image."""
+        return self._payload
+
+    @property
+    def code_span(self) -> Tuple[int, int]:
+        """Provide the address span of the executable code.
+
+           :return: (start address, end address)
+        """
+        # one interval list beats probing each (section, segment) pair
+        seg_ranges = [(p_vaddr, p_vaddr + p_memsz)
+                      for _, _, _, p_vaddr, p_memsz in self._phdrs]
+        base = None
+        last = None
+        for sh_flags, sh_addr, sh_size in self._shdrs:
+            if not sh_flags & SH_FLAGS.SHF_EXECINSTR:
+                continue
+            if not any(lo <= sh_addr < hi for lo, hi in seg_ranges):
+                continue
+            if base is None or sh_addr < base:
+                base = sh_addr
+            if last is None or sh_addr + sh_size > last:
+                last = sh_addr + sh_size
+        if base is None:
+            raise ValueError('No executable section found')
+        return base, last
+
+    def _parse_raw(self, buf) -> bool:
+        """Parse the ELF tables directly from the raw bytes.
+
+           A handful of struct.unpack_from calls replace pyelftools'
+           construct-based machinery on the critical path; only the header
+           fields this tool actually uses are decoded.
+
+           :param buf: a buffer view of the whole ELF file
+           :return: True when parsed, False to fall back to pyelftools
+           :raise ValueError: if the content is not a suitable ELF file
+        """
+        if len(buf) < 16 or bytes(buf[:4]) != self.ELF_MAGIC:
+            raise ValueError('Invalid ELF file')
+        ei_class = buf[4]
+        ei_data = buf[5]
+        if ei_data != 1 or ei_class not in self.HEADER_FORMATS:
+            # big-endian or unknown class
+            return False
+        hfmt = self.HEADER_FORMATS[ei_class]
+        size = len(buf)
+        if size < 16 + calcsize(hfmt):
+            raise ValueError('Invalid ELF file: truncated header')
+        (e_type, e_machine, _, e_entry, e_phoff, e_shoff, _, _,
+         e_phentsize, e_phnum, e_shentsize, e_shnum, _) = \
+            unpack_from(hfmt, buf, 16)
+        if e_machine != self.EM_RISCV:
+            raise ValueError('Not a RISC-V ELF file')
+        if e_type != self.ET_EXEC:
+            raise ValueError('Not an executable ELF file')
+        self._address_size = 32 if ei_class == 1 else 64
+        self._entry = e_entry
+        pfmt = self.PHDR_FORMATS[ei_class]
+        if e_phnum and (e_phentsize < calcsize(pfmt) or
+                        e_phoff + e_phnum * e_phentsize > size):
+            raise ValueError('Invalid ELF file: corrupted program headers')
+        for pix in range(e_phnum):
+            if ei_class == 1:
+                (p_type, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz,
+                 _, _) = unpack_from(pfmt, buf, e_phoff + pix * e_phentsize)
+            else:
+                (p_type, _, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz,
+                 _) = unpack_from(pfmt, buf, e_phoff + pix * e_phentsize)
+            if p_type != self.PT_LOAD or not p_filesz:
+                continue
+            self._phdrs.append((p_paddr, p_filesz, p_offset, p_vaddr,
+                                p_memsz))
+        # both classes lay out the leading section header fields in the
+        # same order, only their widths differ
+        sfmt = self.SHDR_FORMATS[ei_class]
+        if e_shnum and (e_shentsize < calcsize(sfmt) or
+                        e_shoff + e_shnum * e_shentsize > size):
+            raise ValueError('Invalid ELF file: corrupted section headers')
+        for six in range(e_shnum):
+            _, _, sh_flags, sh_addr, _, sh_size = \
+                unpack_from(sfmt, buf, e_shoff + six * e_shentsize)[:6]
+            self._shdrs.append((sh_flags, sh_addr, sh_size))
+        return True
+
+    def _parse_elftools(self) -> None:
+        """Parse the ELF tables with pyelftools.
+
+           Fallback for the ELF flavors the raw parser does not handle;
+           fills in the same caches.
+
+           :raise ValueError: if the ELF file cannot be parsed
+        """
+        try:
+            elf = ELFFile(self._stream)
+        except ELFError as exc:
+            raise ValueError(f'Invalid ELF file: {exc}') from exc
+        if elf['e_machine'] != 'EM_RISCV':
+            raise ValueError('Not a RISC-V ELF file')
+        if elf['e_type'] != 'ET_EXEC':
+            raise ValueError('Not an executable ELF file')
+        self._address_size = elf.elfclass
+        self._entry = elf.header.get('e_entry', None)
+        for segment in elf.iter_segments():
+            if segment['p_type'] not in ('PT_LOAD', ):
+                continue
+            filesz = segment['p_filesz']
+            if not filesz:
+                continue
+            self._phdrs.append((segment['p_paddr'], filesz,
+                                segment['p_offset'], segment['p_vaddr'],
+                                segment['p_memsz']))
+        for section in elf.iter_sections():
+            header = section.header
+            self._shdrs.append((header['sh_flags'], header['sh_addr'],
+                                header['sh_size']))
+
+    def _parse_segments(self) -> Tuple[int, int]:
+        """Parse the loadable segments and provide the physical address
+           and the overall size of the payload.
+
+           :return: (load address, payload size)
+        """
+        size = 0
+        phy_start = None
+        for phy_addr, seg_size, _, _, _ in self._phdrs:
+            if phy_start is None:
+                phy_start = phy_addr
+            else:
+                current_addr = phy_start + size
+                if phy_addr > current_addr:
+                    # loadable segments may be separated with gaps
+                    size += phy_addr - current_addr
+            size += seg_size
+        if phy_start is None:
+            raise ValueError('No loadable segment found')
+        return phy_start, size
+
+    def _build_payload(self) -> bytearray:
+        """Build a flat binary image of the loadable segments, filling
+           any gap with zeroes.
+        """
+        # the overall size is known up front: write each segment at its
+        # final offset in a single preallocated buffer; gaps need no
+        # explicit padding as a new bytearray is already zeroed
+        buf = bytearray(self._payload_size)
+        mview = memoryview(buf)
+        # blit straight from the backing store into the destination buffer
+        src = self._buffer
+        phy_start = self._payload_address
+        for phy_addr, filesz, offset, _, _ in self._phdrs:
+            dst = phy_addr - phy_start
+            mview[dst:dst+filesz] = src[offset:offset+filesz]
+        return buf
@@ -0,0 +1,72 @@
+# Copyright (c) 2024 Rivos, Inc.
+# SPDX-License-Identifier: Apache2
+
+"""Logging helpers.
+"""
+
+from logging import (CRITICAL, DEBUG, ERROR, INFO, WARNING, Formatter, Logger,
+                     StreamHandler, getLogger)
+from sys import stderr
+from typing import List
+
+
+class CustomFormatter(Formatter):
+    """Custom log formatter for ANSI terminals.
+       Colorize log level names.
+    """
+
+    GREY = "\x1b[38;20m"
+    YELLOW = "\x1b[33;1m"
+    RED = "\x1b[31;1m"
+    MAGENTA = "\x1b[35;1m"
+    WHITE = "\x1b[37;1m"
+    RESET = "\x1b[0m"
+    FORMAT_LEVEL = '%(levelname)8s '
+    FORMAT_TRAIL = ' %(name)-10s %(message)s'
+
+    COLOR_FORMATS = {
+        DEBUG: f'{GREY}{FORMAT_LEVEL}{RESET}{FORMAT_TRAIL}',
+        INFO: f'{WHITE}{FORMAT_LEVEL}{RESET}{FORMAT_TRAIL}',
+        WARNING: f'{YELLOW}{FORMAT_LEVEL}{RESET}{FORMAT_TRAIL}',
+        ERROR: f'{RED}{FORMAT_LEVEL}{RESET}{FORMAT_TRAIL}',
+        CRITICAL: f'{MAGENTA}{FORMAT_LEVEL}{RESET}{FORMAT_TRAIL}',
+    }
+
+    PLAIN_FORMAT = f'{FORMAT_LEVEL}{FORMAT_TRAIL}'
+
+    def __init__(self, *args, **kwargs):
+        istty = kwargs.pop('ansi', stderr.isatty())
+        super().__init__(*args, **kwargs)
+        self._istty = istty
+        # Formatter parses its format string at construction time: build
+        # one per level once, rather than a new one for every record
+        self._formatters = {lvl: Formatter(fmt)
+                            for lvl, fmt in self.COLOR_FORMATS.items()}
+        self._plain = Formatter(self.PLAIN_FORMAT)
+
+    def format(self, record):
+        if self._istty:
+            formatter = self._formatters.get(record.levelno, self._plain)
+        else:
+            formatter = self._plain
+        return formatter.format(record)
+
+
+def configure_loggers(level: int, *lognames: str) -> List[Logger]:
+    """Configure loggers.
+
+       :param level: level (verbosity index)
+       :param lognames: one or more loggers to configure
+       :return: configured loggers
+    """
+    loglevel = max(DEBUG, ERROR - (10 * (level or 0)))
+    formatter = CustomFormatter()
+    logh = StreamHandler(stderr)
+    logh.setFormatter(formatter)
+    loggers = []
+    for logname in lognames:
+        log = getLogger(logname)
+        log.setLevel(loglevel)
+        log.addHandler(logh)
+        loggers.append(log)
+    return loggers
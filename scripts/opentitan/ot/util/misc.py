@@ -0,0 +1,156 @@
+# Copyright (c) 2024 Rivos, Inc.
+# SPDX-License-Identifier: Apache2
+
+"""Miscellaneous helpers.
+"""
+
+from sys import stdout
+from typing import Any, Iterable, Optional, TextIO, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_ASCII_TBL = bytes.maketrans(
+    bytes(range(256)),
+    bytes(c if 0x20 <= c < 0x7f else 0x2e for c in range(256)))
+"""Translation table mapping non-printable bytes to a dot."""
+
+_DUMP_VECTOR_THRESHOLD = 64 << 10
+"""Buffer size above which dump_buffer switches to the vectorized path."""
+
+
+class HexInt(int):
+    """Simple wrapper to always represent an integer in hexadecimal
+       format.
+    """
+
+    def __repr__(self) -> str:
+        return f'0x{self:x}'
+
+    @staticmethod
+    def parse(val: Optional[str]) -> Optional[int]:
+        """Simple helper to support hexadecimal integer in argument parser."""
+        if val is None:
+            return None
+        # base 0 lets the C parser auto-detect 0x/0o/0b prefixes in one call
+        return int(val, 0)
+
+
+class EasyDict(dict):
+    """Dictionary whose members can be accessed as instance members.
+    """
+
+    def __init__(self, dictionary=None, **kwargs):
+        if dictionary is not None:
+            self.update(dictionary)
+        self.update(kwargs)
+
+    def __getattr__(self, name):
+        # membership test first: successful lookups (the common case, incl.
+        # hasattr probes) skip the exception setup/teardown entirely
+        if name in self:
+            return dict.__getitem__(self, name)
+        raise AttributeError(f"'{self.__class__.__name__}' object has no "
+                             f"attribute '{name}'")
+
+    # bind the C method directly, skipping an extra Python frame per store
+    __setattr__ = dict.__setitem__
+
+    def __dir__(self) -> Iterable[Any]:
+        items = set(super().__dir__())
+        items.update(set(self))
+        return sorted(items)
+
+
+# pylint: disable=invalid-name
+class classproperty:
+    """Getter property decorator for a class."""
+
+    # a plain descriptor: inheriting from property only added a second
+    # __get__ dispatch for the sole supported (read-only) use case
+    __slots__ = ('fget',)
+
+    def __init__(self, fget):
+        self.fget = fget
+
+    def __get__(self, obj: Any, objtype=None) -> Any:
+        return self.fget(objtype)
+
+
+def round_up(value: int, rnd: int) -> int:
+    """Round up a integer value.
+
+       :param value: the value to round up
+       :param rnd: the rounding unit, which should be a power of two
+    """
+    # the bit trick below is only valid for power-of-two units; the assert
+    # documents the contract and vanishes in -O runs
+    assert rnd & (rnd - 1) == 0, 'rnd must be a power of two'
+    return (value + rnd - 1) & -rnd
+
+
+def dump_buffer(buffer: Union[bytes, bytearray, memoryview], addr: int = 0,
+                file: Optional[TextIO] = None) -> None:
+    """Dump a binary buffer, same format as hexdump -C."""
+    # memoryview slicing is already zero-copy; wrapping other buffer types
+    # makes the slicing below copy-free as well
+    view = buffer if isinstance(buffer, memoryview) else memoryview(buffer)
+    size = len(view)
+    if file is None:
+        file = stdout
+    start = 0
+    if np is not None and size >= _DUMP_VECTOR_THRESHOLD and \
+            addr + size <= 1 << 32:
+        # render all complete lines at once; only a trailing partial line
+        # (if any) is left to the scalar loop below
+        nlines = size >> 4
+        _dump_lines_np(view, nlines, addr, file)
+        start = nlines << 4
+        if start == size:
+            return
+    # hex() and translate() walk each 16-byte line in C, rather than one
+    # Python-level f-string and conditional per byte
+    lines = []
+    for pos in range(start, size, 16):
+        chunk = view[pos:pos+16]
+        hexa = chunk.hex(' ')
+        text = bytes(chunk).translate(_ASCII_TBL).decode('ascii')
+        lines.append(f'{addr+pos:08x}  {hexa:<47s}  |{text}|\n')
+    # a single write keeps the stream lock and flush bookkeeping out of
+    # the per-line loop
+    file.write(''.join(lines))
+
+
+def _dump_lines_np(view: memoryview, nlines: int, addr: int,
+                   file: TextIO) -> None:
+    """Render complete hexdump lines through NumPy lookup tables.
+
+       Produces byte-identical output to the scalar dump_buffer loop: every
+       line is composed in a fixed 78-column character matrix, with the
+       address, hex and ASCII columns filled by vectorized LUT indexing.
+
+       :param view: the buffer to dump
+       :param nlines: the number of complete 16-byte lines to render
+       :param addr: the address of the first buffer byte
+       :param file: the output stream
+    """
+    hexd = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+    atbl = np.frombuffer(_ASCII_TBL, dtype=np.uint8)
+    data = np.frombuffer(view, dtype=np.uint8)[:nlines << 4]
+    data = data.reshape(nlines, 16)
+    # line layout: 8 addr chars, 2 spaces, 47 hex chars, 2 spaces,
+    # '|', 16 text chars, '|', newline
+    out = np.full((nlines, 78), 0x20, dtype=np.uint8)
+    addrs = addr + (np.arange(nlines, dtype=np.uint64) << 4)
+    for col in range(8):
+        out[:, col] = hexd[(addrs >> (28 - 4 * col)) & 0xf]
+    cols = 10 + 3 * np.arange(16)
+    out[:, cols] = hexd[data >> 4]
+    out[:, cols + 1] = hexd[data & 0xf]
+    out[:, 59] = 0x7c
+    out[:, 60:76] = atbl[data]
+    out[:, 76] = 0x7c
+    out[:, 77] = 0x0a
+    file.write(out.tobytes().decode('ascii'))
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2024 Rivos, Inc.
+# SPDX-License-Identifier: Apache2
+
+"""Generate a tiny RISC-V binary that exits QEMU through the test exit
+   device.
+"""
+
+from argparse import ArgumentParser, FileType
+from struct import pack as spack
+from sys import exit as sysexit, modules, stderr
+from traceback import format_exc
+
+BASE_ADDRESS = 0x100000
+"""Default address of the QEMU test exit device."""
+
+_TAIL = spack('<III',
+              0xc0de05b7,   # lui a1, 0xc0de0
+              0x00b52423,   # sw a1, 8(a0)
+              0x10500073)   # wfi
+"""Constant part of the generated code: only the first word varies."""
+
+
+def to_int(value: str) -> int:
+    """Convert a string to an integer, with hexadecimal string support.
+
+       :param value: the string to convert
+       :return: the converted integer
+    """
+    return int(value.strip(), 0)
+
+
+def main():
+    """Main routine."""
+    debug = True
+    try:
+        desc = modules[__name__].__doc__.split('.', 1)[0].strip()
+        argparser = ArgumentParser(description=f'{desc}.')
+        argparser.add_argument('-a', '--address', type=to_int,
+                               default=BASE_ADDRESS,
+                               help=f'address of the test exit device '
+                                    f'(default: 0x{BASE_ADDRESS:x})')
+        argparser.add_argument('-o', '--output', type=FileType('wb'),
+                               required=True,
+                               help='output binary file')
+        argparser.add_argument('-d', '--debug', action='store_true',
+                               help='enable debug mode')
+        args = argparser.parse_args()
+        debug = args.debug
+
+        if args.address & 0xfff:
+            raise ValueError('Device address should be 4KB-aligned')
+        lui = (args.address & 0xfffff000) | 0x537
+        bincode = spack('<I', lui) + _TAIL  # lui a0, hi(address)
+        args.output.write(bincode)
+        sysexit(0)
+    except (IOError, OSError, ValueError) as exc:
+        print(f'\nError: {exc}', file=stderr)
+        if debug:
+            print(format_exc(chain=False), file=stderr)
+        sysexit(1)
+    except KeyboardInterrupt:
+        sysexit(2)
+
+
+if __name__ == '__main__':
+    main()